@@ -1,10 +1,42 @@
+import time
+
 from playwright.async_api import async_playwright
-from typing import Tuple
+from typing import Dict, Tuple
+
+PAGE_CACHE_TTL_SECONDS = 30
+
+# url -> (fetched_at, html_content, visible_question_text)
+_PAGE_CACHE: Dict[str, Tuple[float, str, str]] = {}
+
+
+def invalidate_page_cache(url: str) -> None:
+    """Forget a rendered page, e.g. once the quiz chain has moved past it"""
+    _PAGE_CACHE.pop(url, None)
 
 
 async def fetch_page_html_and_text(url: str) -> Tuple[str, str]:
     """
     Returns (html_content, visible_question_text)
+    Renders are cached per URL for PAGE_CACHE_TTL_SECONDS so a re-visit
+    does not launch the browser again.
+    """
+    now = time.time()
+    cached = _PAGE_CACHE.get(url)
+    if cached and now - cached[0] < PAGE_CACHE_TTL_SECONDS:
+        return cached[1], cached[2]
+
+    html, visible_text = await _render_page(url)
+
+    # Drop expired entries so the cache stays small over a long chain
+    for key in [k for k, v in _PAGE_CACHE.items() if now - v[0] >= PAGE_CACHE_TTL_SECONDS]:
+        del _PAGE_CACHE[key]
+    _PAGE_CACHE[url] = (time.time(), html, visible_text)
+
+    return html, visible_text
+
+
+async def _render_page(url: str) -> Tuple[str, str]:
+    """
     Robust Playwright extraction for IITM quiz pages (base64 + JS rendered).
     """
 
@@ -1,18 +1,45 @@
 
+import asyncio
+import hashlib
 import os
-import json
 import re
+from collections import OrderedDict
 from typing import Dict, Any
 
-import requests
 from dotenv import load_dotenv
 
+from .utils import HTTP_SESSION, loads_json
+
 load_dotenv()
 
 AIPIPE_TOKEN = os.getenv("OPENAI_API_KEY")
 AIPIPE_BASE_URL = os.getenv("AIPIPE_BASE_URL", "https://api.aipipe.org/v1")
 AIPIPE_MODEL = os.getenv("AIPIPE_MODEL", "gpt-4.1-mini")
 
+NUMBER_RE = re.compile(r"-?\d+(\.\d+)?")
+
+# Parsed answers keyed by a digest of the prompt inputs. Requests use
+# temperature 0, so an identical prompt is not worth another round trip.
+ANSWER_CACHE_SIZE = 64
+_ANSWER_CACHE: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+
+
+def _answer_cache_key(*parts: str) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\x00")
+    return h.digest()
+
+
+def invalidate_cached_answer(
+    question_text: str,
+    context_text: str = "",
+    data_notes: str = "",
+) -> None:
+    """Forget the cached answer for these prompt inputs (e.g. once rejected)"""
+    _ANSWER_CACHE.pop(_answer_cache_key(question_text, context_text, data_notes), None)
+
 
 async def ask_llm_for_answer(
     question_text: str,
@@ -26,6 +53,12 @@ async def ask_llm_for_answer(
     if not AIPIPE_TOKEN:
         return {"answer": None, "error": "Missing OPENAI_API_KEY / AI Pipe token"}
 
+    cache_key = _answer_cache_key(question_text, context_text, data_notes)
+    cached = _ANSWER_CACHE.get(cache_key)
+    if cached is not None:
+        _ANSWER_CACHE.move_to_end(cache_key)
+        return dict(cached)
+
     system_msg = (
         "You are a high-precision problem-solving AI.\n\n"
         "You MUST return the final answer in strict JSON format:\n"
@@ -63,9 +96,12 @@ async def ask_llm_for_answer(
 
     # --- API CALL ---
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
+        # Run the blocking request in a thread so the event loop stays free
+        resp = await asyncio.to_thread(
+            HTTP_SESSION.post, url, headers=headers, json=payload, timeout=60
+        )
         resp.raise_for_status()
-        result = resp.json()
+        result = loads_json(resp.content)
     except Exception as e:
         return {"answer": None, "error": f"LLM request failed: {e}"}
 
@@ -75,20 +111,37 @@ async def ask_llm_for_answer(
     except Exception:
         return {"answer": None, "error": "Malformed LLM response", "raw": result}
 
+    answer = parse_answer_text(raw_text)
+
+    # Cache only real replies: request failures return above, and an empty
+    # reply falls back to "0", which must not stick to this prompt
+    if raw_text:
+        _ANSWER_CACHE[cache_key] = answer
+        if len(_ANSWER_CACHE) > ANSWER_CACHE_SIZE:
+            _ANSWER_CACHE.popitem(last=False)
+
+    return dict(answer)
+
+
+def parse_answer_text(raw_text: str) -> Dict[str, Any]:
+    """
+    Extracts the answer from the model's reply, most to least strict.
+    """
+
     # --- 1. Try strict JSON ---
     try:
-        parsed = json.loads(raw_text)
+        parsed = loads_json(raw_text)
         if isinstance(parsed, dict) and "answer" in parsed:
             return {"answer": parsed["answer"]}
     except Exception:
         pass
 
     # --- 2. Try numeric fallback ---
-    number_match = re.search(r"-?\d+(\.\d+)?", raw_text)
+    number_match = NUMBER_RE.search(raw_text)
     if number_match:
         try:
             return {"answer": float(number_match.group())}
-        except:
+        except ValueError:
             pass
 
     # --- 3. Clean fallback text ---
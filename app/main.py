@@ -2,7 +2,6 @@ from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, ValidationError
 from dotenv import load_dotenv
 import os
-import time
 
 from .quiz_solver import solve_quiz
 
@@ -39,14 +38,10 @@ async def handle_quiz(request: Request):
     if payload.secret != SECRET:
         raise HTTPException(status_code=403, detail="Invalid secret")
 
-    start_time = time.time()
-
     result = await solve_quiz(
         email=payload.email,
         secret=payload.secret,
         start_url=payload.url,
-        start_time=start_time,
-        timeout_seconds=170,
     )
 
     return result
@@ -5,17 +5,22 @@ Hard limit: 3 minutes per question
 Max questions: 24
 """
 
+import asyncio
 import time
 import re
-import json
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 
-import requests
-from bs4 import BeautifulSoup
+import pandas as pd
+from bs4 import BeautifulSoup, SoupStrainer
 
-from .browser import fetch_page_html_and_text
-from .llm_interface import ask_llm_for_answer
+from .browser import fetch_page_html_and_text, invalidate_page_cache
+from .llm_interface import ask_llm_for_answer, invalidate_cached_answer
 from .utils import (
+    HTML_PARSER,
+    HTTP_SESSION,
+    dumps_json_bytes,
+    loads_json,
     find_submit_url_from_text,
     find_download_links_from_html,
     normalize_url,
@@ -25,7 +30,6 @@ from .utils import (
     process_image,
     call_api,
     extract_api_urls_from_text,
-    create_visualization,
 )
 
 # ============================================================================
@@ -33,33 +37,72 @@ from .utils import (
 # ============================================================================
 MAX_QUIZ_SECONDS = 180   # 3 minutes per question
 MAX_QUIZZES = 24
+MAX_QUESTION_CANDIDATES = 5
+MAX_PREVIEW_ROWS = 5
+MAX_PREVIEW_COLUMNS = 20
+MAX_PAYLOAD_BYTES = 1_000_000   # submit endpoint limit (1MB)
+MAX_CONTEXT_CHARS = 12000
+
+QUESTION_TAGS = ["h1", "h2", "h3", "p", "div"]
+# One case-insensitive pass instead of lower() + a substring scan per keyword
+QUESTION_KEYWORDS_RE = re.compile(
+    r"question|what|how|calculate|find|count|download|color", re.IGNORECASE
+)
+# Submission instructions (to end of text), code fences and JSON blobs,
+# stripped in a single left-to-right pass
+SANITIZE_RE = re.compile(
+    r"(?i:Post your answer)[\s\S]*"
+    r"|```[\s\S]*?```"
+    r"|\{[^}]{20,}\}"
+)
+# Number or boolean in one match; groups: integer part, fraction, bool
+SCALAR_RE = re.compile(r"(-?\d+)(\.\d+)?|(true|false)", re.IGNORECASE)
+# Indentation and blank lines from rendered pages; dense text fits more
+# content into the character budget
+LINE_BREAK_RE = re.compile(r"\s*\n\s*")
+INLINE_SPACE_RE = re.compile(r"[^\S\n]+")
 
 
 # ============================================================================
 # HELPERS
 # ============================================================================
+@lru_cache(maxsize=32)
 def sanitize_question_text(text: str) -> str:
-    text = re.sub(r"Post your answer[\s\S]*", "", text, flags=re.IGNORECASE)
-    text = re.sub(r"```[\s\S]*?```", "", text)
-    text = re.sub(r"\{[^}]{20,}\}", "", text)
-    return text.strip()
+    # Cached: the page text is sanitized both as the question fallback
+    # and again while building the LLM context
+    return SANITIZE_RE.sub("", text).strip()
+
 
+def compact_page_text(text: str) -> str:
+    # Page text only: the question itself keeps its spacing (tab-separated
+    # data, quoted strings), so it is not passed through here
+    text = INLINE_SPACE_RE.sub(" ", sanitize_question_text(text))
+    return LINE_BREAK_RE.sub("\n", text).strip()
 
-def extract_visible_question(html: str, fallback_text: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
+
+def extract_visible_question(
+    html: str,
+    fallback_text: str,
+    soup: Optional[BeautifulSoup] = None
+) -> str:
+    if soup is None:
+        # Standalone call: build only the subtrees that can hold a question
+        soup = BeautifulSoup(
+            html, HTML_PARSER, parse_only=SoupStrainer(QUESTION_TAGS)
+        )
     candidates: List[str] = []
 
-    for elem in soup.find_all(['h1', 'h2', 'h3', 'p', 'div']):
+    for elem in soup.find_all(QUESTION_TAGS):
         t = elem.get_text().strip()
         if len(t) < 10:
             continue
-        if any(k in t.lower() for k in [
-            'question', 'what', 'how', 'calculate',
-            'find', 'count', 'download', 'color'
-        ]):
+        if QUESTION_KEYWORDS_RE.search(t):
             candidates.append(t)
+            # Nested divs make get_text() costly; stop once we have enough
+            if len(candidates) == MAX_QUESTION_CANDIDATES:
+                break
 
-    raw = "\n".join(candidates[:5]) if candidates else fallback_text
+    raw = "\n".join(candidates) if candidates else fallback_text
     return sanitize_question_text(raw)
 
 
@@ -72,18 +115,27 @@ def normalize_answer_type(val):
 
     if isinstance(val, str):
         s = val.strip()
+        if not s:
+            return s
 
-        if s.lower() in ("true", "false"):
-            return s.lower() == "true"
-
-        if re.fullmatch(r"-?\d+(\.\d+)?", s):
-            return float(s) if "." in s else int(s)
-
-        if s.startswith("{") or s.startswith("["):
+        # Only a bracket pair can be a JSON container
+        if (s[0], s[-1]) in (("{", "}"), ("[", "]")):
             try:
-                return json.loads(s)
-            except:
+                return loads_json(s)
+            except ValueError:
                 pass
+            return s
+
+        # Free-text answers dominate; a number starts with a digit or "-"
+        # and a boolean is at most five characters, so skip the regex early
+        if not (s[0].isdigit() or s[0] == "-" or len(s) <= 5):
+            return s
+
+        m = SCALAR_RE.fullmatch(s)
+        if m:
+            if m.group(3):
+                return m.group(3).lower() == "true"
+            return float(s) if m.group(2) else int(s)
 
         return s
 
@@ -93,63 +145,101 @@ def normalize_answer_type(val):
 # ============================================================================
 # RESOURCE GATHERING
 # ============================================================================
+def load_download_link(
+    quiz_url: str,
+    link: str,
+    api_headers: Dict[str, str]
+) -> Dict[str, Any]:
+    # Blocking download + parse; run via asyncio.to_thread
+    full_url = normalize_url(quiz_url, link)
+
+    if full_url.lower().endswith(".pdf"):
+        return {"url": full_url, "pdf_text": extract_text_from_pdf(full_url, api_headers)}
+
+    meta, df = download_and_load_data(full_url, api_headers)
+    return {"url": full_url, "meta": meta, "df": df}
+
+
+def load_image(
+    quiz_url: str,
+    src: str,
+    api_headers: Dict[str, str]
+) -> Dict[str, Any]:
+    # Blocking download + OCR; run via asyncio.to_thread
+    return process_image(normalize_url(quiz_url, src), api_headers)
+
+
 async def gather_page_resources(
     quiz_url: str,
     html: str,
     text: str,
-    email: str = ""
+    email: str = "",
+    soup: Optional[BeautifulSoup] = None
 ) -> Dict[str, Any]:
 
-    soup = BeautifulSoup(html, "html.parser")
+    if soup is None:
+        soup = BeautifulSoup(html, HTML_PARSER)
 
-    submit_url = find_submit_url_from_text(text) or find_submit_url_from_text(html)
     api_headers = extract_api_headers_from_text(text)
 
+    links = find_download_links_from_html(html, soup, limit=3)
+    # Raw srcs, first three distinct; each is resolved inside its worker so
+    # a malformed one fails that image alone, not the whole page
+    img_srcs = list(dict.fromkeys(
+        img["src"] for img in soup.find_all("img", src=True)
+    ))[:3]
+    apis = extract_api_urls_from_text(text)[:5]
+
+    # Files, images and API calls are independent blocking I/O: run them
+    # all in worker threads at once so the page costs max(latency), not sum
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(load_download_link, quiz_url, link, api_headers)
+            for link in links
+        ),
+        *(
+            asyncio.to_thread(load_image, quiz_url, src, api_headers)
+            for src in img_srcs
+        ),
+        *(
+            asyncio.to_thread(call_api, api["url"], api["method"], api_headers)
+            for api in apis
+        ),
+        return_exceptions=True,
+    )
+    link_results = results[:len(links)]
+    image_results = results[len(links):len(links) + len(img_srcs)]
+    api_results = results[len(links) + len(img_srcs):]
+
     dataframes = []
     data_context = []
     pdf_texts = []
 
-    for link in find_download_links_from_html(html)[:3]:
-        try:
-            full_url = normalize_url(quiz_url, link)
-
-            if full_url.lower().endswith(".pdf"):
-                pdf = extract_text_from_pdf(full_url, api_headers)
-                pdf_texts.append(pdf[:2000])
-                continue
-
-            meta, df = download_and_load_data(full_url, api_headers)
-            dataframes.append({"url": full_url, "df": df})
-            data_context.append(meta)
-
-        except Exception as e:
-            data_context.append(f"Failed {link}: {e}")
-
-    image_data = []
-    for img in soup.find_all("img", src=True)[:3]:
-        try:
-            img_url = normalize_url(quiz_url, img["src"])
-            info = process_image(img_url, api_headers)
-            if "error" not in info:
-                image_data.append(info)
-        except:
-            pass
-
-    api_responses = []
-    for api in extract_api_urls_from_text(text)[:5]:
-        try:
-            res = call_api(api["url"], api["method"], api_headers)
-            if res.get("success"):
-                api_responses.append({
-                    "url": api["url"],
-                    "method": api["method"],
-                    "response": res.get("data") or res.get("text")
-                })
-        except:
-            pass
+    for link, res in zip(links, link_results):
+        if isinstance(res, Exception):
+            data_context.append(f"Failed {link}: {res}")
+        elif "pdf_text" in res:
+            pdf_texts.append(res["pdf_text"][:2000])
+        else:
+            dataframes.append({"url": res["url"], "df": res["df"]})
+            data_context.append(res["meta"])
+
+    image_data = [
+        info for info in image_results
+        if isinstance(info, dict) and "error" not in info
+    ]
+
+    api_responses = [
+        {
+            "url": api["url"],
+            "method": api["method"],
+            "response": res.get("data") or res.get("text")
+        }
+        for api, res in zip(apis, api_results)
+        if isinstance(res, dict) and res.get("success")
+    ]
 
     return {
-        "submit_url": submit_url,
         "dataframes": dataframes,
         "data_context_text": "\n".join(data_context),
         "pdf_texts": pdf_texts,
@@ -173,18 +263,45 @@ def build_llm_context(
         "=== QUESTION ===",
         question[:800],
         "\n=== PAGE TEXT ===",
-        sanitize_question_text(page_text)[:1500],
+        compact_page_text(page_text)[:1500],
     ]
 
     if email:
         parts.append(f"\nEmail: {email}")
         parts.append(f"Email length mod 2: {len(email) % 2}")
 
+    # Everything past MAX_CONTEXT_CHARS is cut anyway, so stop rendering
+    # previews and dumps once the budget is spent
+    def has_room() -> bool:
+        return sum(len(p) + 1 for p in parts) < MAX_CONTEXT_CHARS
+
     for item in resources["dataframes"]:
+        if not has_room():
+            break
         df = item["df"]
+        head = df.iloc[:MAX_PREVIEW_ROWS, :MAX_PREVIEW_COLUMNS]
         parts.append(f"\nFile: {item['url']}")
         parts.append(f"Shape: {df.shape}")
-        parts.append(df.head(8).to_string())
+        # Column types up front let the LLM read the sample rows correctly
+        # without a longer preview
+        parts.append("Columns: " + ",".join(
+            f"{c}:{t}" for c, t in head.dtypes.items()
+        ))
+        # CSV is cheaper to produce than to_string()'s aligned table and
+        # uses fewer tokens; very wide frames are cut to the first columns
+        # A default RangeIndex is noise, but read_json puts object keys in
+        # the index, where the labels are the data
+        parts.append(head.to_csv(
+            index=not isinstance(df.index, pd.RangeIndex)
+        ).rstrip())
+        # The sample rows cannot answer aggregate questions about the whole
+        # file; vectorized column totals can, without shipping every row
+        if len(df) > MAX_PREVIEW_ROWS:
+            numeric = df.iloc[:, :MAX_PREVIEW_COLUMNS].select_dtypes("number")
+            if not numeric.empty:
+                stats = numeric.agg(["count", "sum", "mean", "min", "max"])
+                parts.append("Stats (all rows):")
+                parts.append(stats.to_csv().rstrip())
 
     if resources["pdf_texts"]:
         parts.append("\n=== PDF ===")
@@ -193,15 +310,21 @@ def build_llm_context(
     if resources["image_data"]:
         parts.append("\n=== IMAGES ===")
         for img in resources["image_data"]:
-            parts.append(str(img))
+            if not has_room():
+                break
+            # The base64 payload can be megabytes and is noise to the LLM
+            parts.append(str({k: v for k, v in img.items() if k != "base64"}))
 
     if resources["api_responses"]:
         parts.append("\n=== API ===")
         for api in resources["api_responses"]:
-            parts.append(json.dumps(api, indent=2)[:800])
+            if not has_room():
+                break
+            # Compact dump: indent=2 is slower and mostly whitespace
+            parts.append(dumps_json_bytes(api).decode()[:800])
 
     ctx = "\n".join(parts)
-    return ctx[:12000]
+    return ctx[:MAX_CONTEXT_CHARS]
 
 
 # ============================================================================
@@ -224,14 +347,22 @@ async def solve_single_quiz(
         html, text = await fetch_page_html_and_text(quiz_url)
         check_timeout()
 
-        question = extract_visible_question(html, text)
-        resources = await gather_page_resources(quiz_url, html, text, email)
-        check_timeout()
-
-        submit_url = resources["submit_url"] or cached_submit_url
+        # Cheap regex check first: without a submit URL there is no point
+        # downloading files, images and APIs for this page
+        submit_url = (
+            find_submit_url_from_text(text)
+            or find_submit_url_from_text(html)
+            or cached_submit_url
+        )
         if not submit_url:
             return {"correct": False, "error": "Submit URL not found"}
 
+        # Parse once; both helpers only read from the tree
+        soup = BeautifulSoup(html, HTML_PARSER)
+        question = extract_visible_question(html, text, soup)
+        resources = await gather_page_resources(quiz_url, html, text, email, soup)
+        check_timeout()
+
         context = build_llm_context(question, text, resources, email)
         llm = await ask_llm_for_answer(context)
         check_timeout()
@@ -245,9 +376,28 @@ async def solve_single_quiz(
             "answer": answer,
         }
 
-        r = requests.post(submit_url, json=payload, timeout=15)
+        # Encode once: the same bytes are size-checked and sent
+        body = dumps_json_bytes(payload)
+        if len(body) > MAX_PAYLOAD_BYTES:
+            return {
+                "correct": False,
+                "error": f"Answer payload too large ({len(body)} bytes)",
+                "quiz_time": time.time() - quiz_start,
+            }
+
+        r = await asyncio.to_thread(
+            HTTP_SESSION.post,
+            submit_url,
+            data=body,
+            headers={"Content-Type": "application/json"},
+            timeout=15,
+        )
         r.raise_for_status()
-        data = r.json()
+        data = loads_json(r.content)
+        if not data.get("correct"):
+            # A retry rebuilds the same context; make it ask the model again
+            # instead of resubmitting the answer that was just rejected
+            invalidate_cached_answer(context)
 
         return {
             "correct": bool(data.get("correct")),
@@ -285,6 +435,7 @@ async def solve_quiz(
     current_url = start_url
     cached_submit_url = None
     history = []
+    visited = {start_url}
 
     for quiz_number in range(1, MAX_QUIZZES + 1):
 
@@ -320,6 +471,18 @@ async def solve_quiz(
                 "message": f"Solved {quiz_number} quizzes successfully",
             }
 
+        # A chain that points back to a solved page would only repeat work
+        # until MAX_QUIZZES runs out
+        if result["url"] in visited:
+            return {
+                "status": "failed",
+                "history": history,
+                "message": f"Quiz chain loops back to {result['url']}",
+            }
+        visited.add(result["url"])
+
+        # The page was answered correctly; a cached render is now stale
+        invalidate_page_cache(current_url)
         current_url = result["url"]
 
     return {
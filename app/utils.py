@@ -11,73 +11,172 @@ Enhanced utilities for handling various question types:
 
 import re
 import base64
+import datetime
 import io
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from importlib.util import find_spec
 from typing import Dict, Any, List, Tuple, Optional
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# Optional heavy libraries are only probed here, not imported: matplotlib
+# and seaborn alone add about a second to startup. Each helper imports
+# what it needs on first use
 
 # For PDF handling
-try:
-    import PyPDF2
-    import pdfplumber
-    HAS_PDF = True
-except ImportError:
-    HAS_PDF = False
+HAS_PDF = all(find_spec(m) for m in ("PyPDF2", "pdfplumber"))
 
 # For image handling
-try:
-    from PIL import Image
-    import pytesseract
-    HAS_IMAGE = True
-except ImportError:
-    HAS_IMAGE = False
+HAS_IMAGE = all(find_spec(m) for m in ("PIL", "pytesseract"))
 
 # For visualization
+HAS_VIZ = all(find_spec(m) for m in ("matplotlib", "seaborn"))
+
+# For fast CSV parsing (also backs read_parquet)
+HAS_ARROW = find_spec("pyarrow") is not None
+
+# C-backed HTML parser; html.parser is the pure-Python fallback
+HTML_PARSER = "lxml" if find_spec("lxml") else "html.parser"
+
+# For fast JSON encoding/decoding
 try:
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    HAS_VIZ = True
+    import orjson
+    HAS_ORJSON = True
 except ImportError:
-    HAS_VIZ = False
+    HAS_ORJSON = False
+
+# Shared session so repeat requests to the same host reuse keep-alive
+# connections instead of paying a new TCP + TLS handshake each time
+HTTP_SESSION = requests.Session()
+# Up to 11 resource fetches per page run concurrently, often against one
+# host; the default 10-connection pool would drop the extra keep-alives
+HTTP_POOL_SIZE = 16
+# Transient gateway errors are retried in place with a short backoff, which
+# is far cheaper than failing the quiz. Only idempotent methods are retried,
+# so answer submissions are never sent twice
+HTTP_RETRY = Retry(
+    total=2,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    raise_on_status=False,
+    # A read timeout means the server took the request and hung; retrying
+    # would multiply the 30s timeout per download, image or API call
+    read=False,
+    # A server's Retry-After could sleep the worker thread far past the
+    # per-question budget; stick to our own short backoff
+    respect_retry_after_header=False,
+)
+_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=4, pool_maxsize=HTTP_POOL_SIZE, max_retries=HTTP_RETRY
+)
+HTTP_SESSION.mount("http://", _HTTP_ADAPTER)
+HTTP_SESSION.mount("https://", _HTTP_ADAPTER)
+
+# Parsed data files keyed by (url, headers); downloads run in worker
+# threads, hence the lock
+DATA_CACHE_SIZE = 16
+DATA_CACHE_TTL_SECONDS = 600
+_DATA_CACHE: "OrderedDict[Tuple[str, frozenset], Tuple[float, str, pd.DataFrame]]" = OrderedDict()
+_DATA_CACHE_LOCK = threading.Lock()
+
+DATA_FILE_EXTENSIONS = ('.csv', '.xlsx', '.xls', '.json', '.pdf', '.txt', '.parquet')
+API_HEADER_NAMES = frozenset({'authorization', 'x-api-key', 'api-key', 'token'})
+
+# Matches only the header names we care about (capitalised, any case after)
+# so the scan skips every other "Word: value" line in the page
+API_HEADER_RE = re.compile(
+    r"(?<![A-Za-z-])((?=[A-Z])(?i:"
+    + "|".join(re.escape(h) for h in sorted(API_HEADER_NAMES, key=len, reverse=True))
+    + r")):\s*([^\n\r]+)"
+)
+
+# Tried in order; the first pattern that matches wins
+SUBMIT_URL_PATTERNS = tuple(
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"post.*?to\s+(https?://[^\s\"'<>]+)",
+        r"submit.*?to\s+(https?://[^\s\"'<>]+)",
+        r"POST\s+(https?://[^\s\"'<>]+)",
+    )
+)
+
+# Endpoints with an explicit method, then any URL following "API"
+API_METHOD_URL_RE = re.compile(r"(GET|POST|PUT|DELETE)\s+(https?://[^\s\"'<>]+)", re.IGNORECASE)
+API_PLAIN_URL_RE = re.compile(r"API.*?(https?://[^\s\"'<>]+)", re.IGNORECASE)
 
 
 def normalize_url(base_url: str, link: str) -> str:
     """Convert relative URLs to absolute URLs"""
-    if link.startswith("http://") or link.startswith("https://"):
-        return link
+    # urljoin already returns absolute links unchanged
     return urljoin(base_url, link)
 
 
+def dumps_json_bytes(obj: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes, using orjson when available"""
+    if HAS_ORJSON:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            # e.g. integers wider than 64 bits; stdlib json handles them
+            pass
+    # Non-ASCII goes out as raw UTF-8, matching orjson, instead of \uXXXX
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads_json(data: Any) -> Any:
+    """Parse JSON from str or bytes, using orjson when available"""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def find_submit_url_from_text(text: str) -> Optional[str]:
     """Extract submit URL from page text"""
-    patterns = [
-        r"post.*?to\s+(https?://[^\s\"'<>]+)",
-        r"submit.*?to\s+(https?://[^\s\"'<>]+)",
-        r"POST\s+(https?://[^\s\"'<>]+)",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    # Every pattern needs an absolute URL; a substring test is far cheaper
+    if "://" not in text:
+        return None
+
+    for pattern in SUBMIT_URL_PATTERNS:
+        match = pattern.search(text)
         if match:
             return match.group(1).rstrip(".,;:")
     
     return None
 
 
-def find_download_links_from_html(html: str) -> List[str]:
-    """Find downloadable file links (CSV, Excel, PDF, JSON, etc.)"""
-    soup = BeautifulSoup(html, "html.parser")
+def find_download_links_from_html(
+    html: str,
+    soup: Optional[BeautifulSoup] = None,
+    limit: Optional[int] = None,
+) -> List[str]:
+    """Find downloadable file links (CSV, Excel, PDF, JSON, etc.)
+
+    Pass an already parsed `soup` to avoid building the DOM a second time,
+    and `limit` to stop scanning once that many links are found.
+    """
+    if soup is None:
+        # Only anchors matter here; skip building the rest of the tree
+        soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer("a"))
     links = []
     
-    file_extensions = ['.csv', '.xlsx', '.xls', '.json', '.pdf', '.txt', '.parquet']
-    
     for a in soup.find_all("a", href=True):
         href = a["href"]
-        if any(href.lower().endswith(ext) for ext in file_extensions):
+        # The same file is often linked twice; download it only once
+        if href.lower().endswith(DATA_FILE_EXTENSIONS) and href not in links:
             links.append(href)
+            if len(links) == limit:
+                break
     
     return links
 
@@ -87,12 +186,8 @@ def extract_api_headers_from_text(text: str) -> Dict[str, str]:
     headers = {}
     
     # Look for header patterns like: "X-API-Key: abc123" or "Authorization: Bearer token"
-    header_pattern = r"([A-Z][a-zA-Z-]+):\s*([^\n\r]+)"
-    matches = re.findall(header_pattern, text)
-    
-    for key, value in matches:
-        if key.lower() in ['authorization', 'x-api-key', 'api-key', 'token']:
-            headers[key] = value.strip()
+    for match in API_HEADER_RE.finditer(text):
+        headers[match.group(1)] = match.group(2).strip()
     
     return headers
 
@@ -102,8 +197,78 @@ def download_and_load_data(url: str, headers: Optional[Dict] = None) -> Tuple[st
     Download and load data file (CSV, Excel, JSON, etc.)
     Returns (metadata_string, dataframe)
     """
+    # Consecutive quiz pages often link the same dataset
+    key = (url, frozenset((headers or {}).items()))
+    with _DATA_CACHE_LOCK:
+        cached = _DATA_CACHE.get(key)
+        if cached and time.time() - cached[0] < DATA_CACHE_TTL_SECONDS:
+            _DATA_CACHE.move_to_end(key)
+        else:
+            cached = None
+    if cached:
+        _, meta, df = cached
+        # Hand out a copy so callers cannot mutate the cached frame
+        return meta, df.copy()
+    
+    meta, df = _fetch_and_load_data(url, headers)
+    with _DATA_CACHE_LOCK:
+        _DATA_CACHE[key] = (time.time(), meta, df)
+        _DATA_CACHE.move_to_end(key)
+        if len(_DATA_CACHE) > DATA_CACHE_SIZE:
+            _DATA_CACHE.popitem(last=False)
+    return meta, df.copy()
+
+
+def _read_csv_bytes(content: bytes) -> pd.DataFrame:
+    """Parse CSV bytes, preferring pyarrow's multithreaded C++ reader"""
+    if HAS_ARROW:
+        try:
+            df = pd.read_csv(io.BytesIO(content), engine="pyarrow")
+            # Where pyarrow's inference is known to differ, re-read with the
+            # C engine so the LLM sees the same frame either way
+            if not _differs_from_c_engine(df):
+                return df
+        except Exception:
+            # pyarrow is stricter about ragged rows and quoting; the C
+            # engine gets the final say
+            pass
+    return pd.read_csv(io.BytesIO(content))
+
+
+def _differs_from_c_engine(df: pd.DataFrame) -> bool:
+    """Detect the known cases where pyarrow's read_csv departs from the C engine"""
+    # Header-only files come back float64 instead of object
+    if df.empty:
+        return True
+    # The C engine renames blank headers to "Unnamed: N" and mangles
+    # duplicates to "a.1"; pyarrow keeps them as written
+    names = list(df.columns)
+    if "" in names or len(set(names)) != len(names):
+        return True
+    for _, col in df.items():
+        # Integers beyond int64 become lossy float64 (C engine: uint64/object)
+        if col.dtype.kind == "f" and (col.abs() >= 2 ** 63).any():
+            return True
+        # Dates and timestamps are inferred; the C engine keeps strings
+        if _is_temporal(col):
+            return True
+    return False
+
+
+def _is_temporal(col: pd.Series) -> bool:
+    """True for datetime64 columns and object columns of date/time values"""
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return True
+    if col.dtype != object:
+        return False
+    # Arrow-inferred columns are homogeneous; one value tells the type
+    first = col.first_valid_index()
+    return first is not None and isinstance(col[first], (datetime.date, datetime.time))
+
+
+def _fetch_and_load_data(url: str, headers: Optional[Dict] = None) -> Tuple[str, pd.DataFrame]:
     try:
-        response = requests.get(url, headers=headers or {}, timeout=30)
+        response = HTTP_SESSION.get(url, headers=headers or {}, timeout=30)
         response.raise_for_status()
         
         # Determine file type
@@ -112,7 +277,7 @@ def download_and_load_data(url: str, headers: Optional[Dict] = None) -> Tuple[st
         
         # CSV
         if 'csv' in content_type or url_lower.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(response.content))
+            df = _read_csv_bytes(response.content)
             meta = f"CSV file: {url}\nShape: {df.shape}\nColumns: {list(df.columns)}"
             return meta, df
         
@@ -136,7 +301,7 @@ def download_and_load_data(url: str, headers: Optional[Dict] = None) -> Tuple[st
         
         # Try CSV as default
         else:
-            df = pd.read_csv(io.BytesIO(response.content))
+            df = _read_csv_bytes(response.content)
             meta = f"Data file: {url}\nShape: {df.shape}\nColumns: {list(df.columns)}"
             return meta, df
             
@@ -150,7 +315,10 @@ def extract_text_from_pdf(url: str, headers: Optional[Dict] = None) -> str:
         return "PDF libraries not available"
     
     try:
-        response = requests.get(url, headers=headers or {}, timeout=30)
+        import PyPDF2
+        import pdfplumber
+        
+        response = HTTP_SESSION.get(url, headers=headers or {}, timeout=30)
         response.raise_for_status()
         
         # Try pdfplumber first (better for tables)
@@ -170,7 +338,7 @@ def extract_text_from_pdf(url: str, headers: Optional[Dict] = None) -> str:
                             text_parts.append(df.to_string())
                 
                 return "\n".join(text_parts)
-        except:
+        except Exception:
             pass
         
         # Fallback to PyPDF2
@@ -195,7 +363,10 @@ def process_image(url: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
         return {"error": "Image libraries not available"}
     
     try:
-        response = requests.get(url, headers=headers or {}, timeout=30)
+        from PIL import Image
+        import pytesseract
+        
+        response = HTTP_SESSION.get(url, headers=headers or {}, timeout=30)
         response.raise_for_status()
         
         image = Image.open(io.BytesIO(response.content))
@@ -211,13 +382,12 @@ def process_image(url: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
         try:
             text = pytesseract.image_to_string(image)
             result["ocr_text"] = text
-        except:
+        except Exception:
             result["ocr_text"] = "OCR not available"
         
-        # Convert to base64 for potential submission
-        buffer = io.BytesIO()
-        image.save(buffer, format=image.format or 'PNG')
-        result["base64"] = base64.b64encode(buffer.getvalue()).decode()
+        # Encode the downloaded bytes directly; re-saving through PIL only
+        # to base64 the result costs a full decode/encode round trip
+        result["base64"] = base64.b64encode(response.content).decode()
         
         return result
         
@@ -234,6 +404,9 @@ def create_visualization(data: pd.DataFrame, chart_type: str = "auto") -> str:
         return None
     
     try:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
         plt.figure(figsize=(10, 6))
         
         if chart_type == "auto":
@@ -272,7 +445,7 @@ def create_visualization(data: pd.DataFrame, chart_type: str = "auto") -> str:
         return f"data:image/png;base64,{image_base64}"
         
     except Exception as e:
-        print(f"Visualization error: {str(e)}")
+        logger.warning("Visualization error: %s", e)
         return None
 
 
@@ -283,7 +456,7 @@ def call_api(url: str, method: str = "GET", headers: Optional[Dict] = None,
     Returns parsed response
     """
     try:
-        response = requests.request(
+        response = HTTP_SESSION.request(
             method=method.upper(),
             url=url,
             headers=headers or {},
@@ -295,9 +468,9 @@ def call_api(url: str, method: str = "GET", headers: Optional[Dict] = None,
         
         # Try to parse as JSON
         try:
-            data = response.json()
+            data = loads_json(response.content)
             return {"success": True, "data": data, "text": response.text[:1000]}
-        except:
+        except ValueError:
             return {"success": True, "text": response.text[:5000]}
             
     except Exception as e:
@@ -306,24 +479,22 @@ def call_api(url: str, method: str = "GET", headers: Optional[Dict] = None,
 
 def extract_api_urls_from_text(text: str) -> List[Dict[str, Any]]:
     """Extract API endpoints mentioned in text"""
-    api_info = []
-    
-    # Look for API patterns
-    api_pattern = r"(GET|POST|PUT|DELETE)\s+(https?://[^\s\"'<>]+)"
-    matches = re.findall(api_pattern, text, re.IGNORECASE)
-    
-    for method, url in matches:
-        api_info.append({"method": method.upper(), "url": url})
+    if "://" not in text:
+        return []
     
-    # Also look for plain API URLs
-    url_pattern = r"API.*?(https?://[^\s\"'<>]+)"
-    matches = re.findall(url_pattern, text, re.IGNORECASE)
+    # Ordered (method, url) keys: GET and POST of one URL are both kept, a
+    # repeated mention of the same call is listed (and later made) once
+    endpoints: Dict[Tuple[str, str], None] = {}
+    for match in API_METHOD_URL_RE.finditer(text):
+        method, url = match.groups()
+        endpoints[(method.upper(), url)] = None
     
-    for url in matches:
-        if not any(api["url"] == url for api in api_info):
-            api_info.append({"method": "GET", "url": url})
+    # Also look for plain API URLs not already covered by a method match
+    seen_urls = {url for _, url in endpoints}
+    for match in API_PLAIN_URL_RE.finditer(text):
+        url = match.group(1)
+        if url not in seen_urls:
+            seen_urls.add(url)
+            endpoints[("GET", url)] = None
     
-    return api_info
-
-
-
+    return [{"method": method, "url": url} for method, url in endpoints]